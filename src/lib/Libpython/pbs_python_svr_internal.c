@@ -2814,15 +2814,15 @@ pbs_python_populate_svrattrl_from_python_class(PyObject *py_instance,
 				goto svrattrl_exit;
 			}
 
-			/* look into <class pbs_resource>._attributes_unknown
+			/* look into <pbs_resource instance>._attributes_unknown
 			 * for custom resource names defined in a hook but
 			 * not yet in resource table.
 			 */
-			if (PyObject_HasAttrString(py_class,
+			if (PyObject_HasAttrString(py_val,
 				"_attributes_unknown")) {
 				PyObject *py_i = NULL;
 
-				py_keys_dict2 = PyObject_GetAttrString(py_class,
+				py_keys_dict2 = PyObject_GetAttrString(py_val,
 					"_attributes_unknown");
 				/* must be Py_CLEAR(-)ed or Py_DECREF()-ed
 				 * later, so as to not leak memory
@@ -42,6 +42,9 @@ All Python based types mapping to PBS attribute types.
 """
 
 _ATTRIBUTES_KEY_NAME = 'attributes'
+# _ATTRIBUTES_LOWER_KEY_NAME: optional class mapping of lowercased attribute
+# names to their registered names, for classes matching names caselessly.
+_ATTRIBUTES_LOWER_KEY_NAME = '_attributes_lower'
 
 __all__ = [ '_generic_attr',
             'size',
@@ -86,7 +89,10 @@ __all__ = [ '_generic_attr',
 	    'join_path',
             'PbsAttributeDescriptor',
             'PbsReadOnlyDescriptor',
+            'PbsInstanceDictDescriptor',
             'pbs_resource',
+            'get_changes',
+            'has_changes',
 	    'vchunk',
 	    'vnode_state',
 	    'vnode_sharing',
@@ -96,6 +102,7 @@ __all__ = [ '_generic_attr',
 import _pbs_v1
 import sys
 import math
+import weakref
 _size = _pbs_v1.svr_types._size
 _LOG  = _pbs_v1.logmsg
 _IS_SETTABLE = _pbs_v1.is_attrib_val_settable
@@ -110,7 +117,8 @@ class PbsAttributeDescriptor(object):
       - Add the attribute name to the dictionary 'attributes' on the instance if
         it exists.
       - Since a Descriptor is a class level object, to maintain unique values
-        across instances, we maintain an internal dictionary.
+        across instances, each value is kept in the instance's own __dict__
+        under the attribute name, and so goes away with the instance.
     """
     
     def __init__(self, cls, name, default_value, value_type=None, resc_attr=None,is_entity=0):
@@ -146,8 +154,10 @@ class PbsAttributeDescriptor(object):
         
         __attributes = getattr(cls, _ATTRIBUTES_KEY_NAME)
         __attributes[name] = None
-        #: now we need to maintain a unique value for each object
-        self.__per_instance = {}
+
+        __attributes_lower = getattr(cls, _ATTRIBUTES_LOWER_KEY_NAME, None)
+        if __attributes_lower is not None:
+            __attributes_lower[name.lower()] = name
         
     #: m(__init__)
 
@@ -166,11 +176,11 @@ class PbsAttributeDescriptor(object):
         #  caused pbs_resource to be instantiated every time. Probably due to
         #  _get_default_value() getting evaluatd every time.
 
-        if obj not in self.__per_instance:
-             v = self._get_default_value()
-             self.__per_instance[obj] = v
+        d = obj.__dict__
+        if self._name not in d:
+             d[self._name] = self._get_default_value()
 
-        return self.__per_instance[obj]
+        return d[self._name]
     #: m(__get__)
     
     def __set__(self, obj, value):
@@ -205,7 +215,7 @@ class PbsAttributeDescriptor(object):
             else:
                 set_value = self._value_type[0](value)
         #:
-        self.__per_instance[obj] = set_value
+        obj.__dict__[self._name] = set_value
     #: m(__set__)
     
     def _set_resc_atttr(self, resc_attr, is_entity=0):
@@ -220,7 +230,7 @@ class PbsAttributeDescriptor(object):
     def __delete__(self, obj):
         """__delete__, we just set the attribute value to None"""
        
-        self.__per_instance[obj] = None
+        obj.__dict__[self._name] = None
     #: m(__delete__)
 
     def _get_default_value(self): 
@@ -286,6 +296,150 @@ class PbsReadOnlyDescriptor(object):
     
 #: End Class PbsReadOnlyDescriptor
 
+
+class PbsInstanceDictDescriptor(object):
+    """This class wraps a dictionary of per-instance data, such as
+    _attributes_hook_set, into a *DATA* descriptor.
+
+    Such data used to be kept in a class level dictionary keyed by instance,
+    which grew with every instance ever used. The dictionary is now kept in
+    the instance's own __dict__, and accessing the descriptor from an
+    instance 'obj' returns {obj: <that dictionary>}, so that the
+    'obj.<name>[obj]' lookups done here and by the C runtime still work.
+    The instance dictionary is created on first access.
+    """
+
+    def __init__(self, name):
+        """
+        """
+        self._name = name
+    #: m(__init__)
+
+    def __get__(self, obj, cls=None):
+        """get"""
+
+        if obj is None:
+            return self
+
+        d = obj.__dict__.get(self._name)
+        if d is None:
+            d = {}
+            obj.__dict__[self._name] = d
+        return {obj: d}
+    #: m(__get__)
+
+    def __set__(self, obj, value):
+        """set"""
+        raise BadAttributeValueError("<%s> is readonly" % (self._name,))
+    #: m(__set__)
+
+    def __delete__(self, obj):
+        """delete, we just empty the dictionary"""
+        obj.__dict__.pop(self._name, None)
+    #: m(__delete__)
+
+#: End Class PbsInstanceDictDescriptor
+
+#: ------------------     HOOK SET TRACKING           ---------------------
+# _hook_set_refs: weak references to the objects that had attributes set in
+#                 the hook script for the current event, in the order they
+#                 were first set, with _hook_set_ids mapping the id() of each
+#                 object to its reference. _hook_set_event refers (weakly) to
+#                 that event: the first attribute set for another event
+#                 resets the tracking, emptying the objects' hook set.
+_hook_set_refs = []
+_hook_set_ids = {}
+_hook_set_event = None
+
+#
+# _hook_set_check_event: resets the hook set tracking if the current event is
+#                        not the one the objects were tracked for.
+def _hook_set_check_event():
+        global _hook_set_refs, _hook_set_ids, _hook_set_event
+
+        ev = _pbs_v1.event()
+        if (_hook_set_event == None) or (_hook_set_event() is not ev):
+            for ref in _hook_set_refs:
+                o = ref()
+                if o is not None:
+                    o._attributes_hook_set[o].clear()
+            _hook_set_refs = []
+            _hook_set_ids = {}
+            try:
+                _hook_set_event = weakref.ref(ev)
+            except TypeError:
+                _hook_set_event = lambda: ev
+
+#
+# _hook_set_mark: records in 'obj._attributes_hook_set[obj]' that attribute
+#                 'name' has been set in the hook script. The dictionary value
+#                 is the attribute value before it was first set ('old'), as
+#                 the C runtime only looks at the keys.
+def _hook_set_mark(obj, name, old):
+        _hook_set_check_event()
+
+        ref = _hook_set_ids.get(id(obj))
+        if (ref == None) or (ref() is not obj):
+            try:
+                ref = weakref.ref(obj)
+            except TypeError:
+                ref = lambda: obj
+            _hook_set_refs.append(ref)
+            _hook_set_ids[id(obj)] = ref
+
+        obj._attributes_hook_set[obj].setdefault(name, old)
+
+def get_changes(obj):
+        """
+        Returns the list of (<attribute>, <resource>, <old value>, <new value>)
+        tuples for the attributes of 'obj' (a job, vnode, reservation or
+        resource list) set in the hook script for the current event, and for
+        the resources set in its resource list attributes. <resource> is None
+        for attributes that are not resource lists. Attributes set back to
+        their original value are left out.
+        """
+        _hook_set_check_event()
+
+        changes = []
+        if isinstance(obj, pbs_resource):
+            attr = obj._name
+        else:
+            attr = None
+        for (name, old) in obj.__dict__.get('_attributes_hook_set',
+                                            {}).iteritems():
+            if name.startswith("_"):
+                continue
+            new = getattr(obj, name, None)
+            if (new is old) or (new == old):
+                continue
+            if attr is None:
+                changes.append((name, None, old, new))
+            else:
+                changes.append((attr, name, old, new))
+
+        if attr is None:
+            for val in obj.__dict__.values():
+                if isinstance(val, pbs_resource) and \
+                                val.__dict__.get('_attributes_hook_set'):
+                    changes.extend(get_changes(val))
+        return changes
+
+def has_changes(obj=None):
+        """
+        Returns True if 'obj' has any changes per get_changes(). If 'obj'
+        is None, returns True if any object has attributes set in the hook
+        script for the current event that differ from their original value.
+        """
+        if obj is not None:
+            return len(get_changes(obj)) > 0
+
+        _hook_set_check_event()
+        for ref in _hook_set_refs:
+            o = ref()
+            if (o is not None) and get_changes(o):
+                return True
+        return False
+
 #
 from _exc_types import *
 
@@ -319,55 +473,38 @@ class _generic_attr(object):
 # to_bytes: given a _size 'sz' value, returns an integer which is the
 # equivalent number of bytes.
 def to_bytes(sz):
-
-    s_str = str(sz).rstrip("bB");
-    sl = len(s_str)
-    wordsz = 1
-    if (s_str[sl-1] == "w") or (s_str[sl-1] == "W"):
-        s_str = s_str.rstrip("wW")
-        wordsz = _pbs_v1.wordsize()
-	
-    sl = len(s_str)
-    if (s_str[sl-1] == "k") or (s_str[sl-1] == "K"):
-        s_num = int(s_str.rstrip("kK"))*1024
-    else:
-        s_num = int(s_str)
-
-    s_num *= wordsz
-    return s_num
-
-# transform_sizes: return _size transformation of 'sz1' and 'sz2' that
-# can be fed to the richcompare functions of _size without causing an
-# overflow or rounding up inherent in small values.
-def transform_sizes(sz1, sz2):
-
-    s_num = -1
-    s = sz1
-    if isinstance(sz1,(int,long,size)):
-        s = _size(str(sz1))
-        if s.__le__(_size("10kb")):
-            # make all values at least 10kb to prevent rounding up errors
-            # in normalize_size().  Here, we make it relative to 1gb.
-            s_num = to_bytes(s) + 1073741824
-            s = _size(s_num)
-
-    o_num = -1
-    o = sz2 
-    if isinstance(sz2,(int,long,size)):
-        o = _size(str(sz2))
-        if o.__le__(_size("10kb")):
-            # make all values at least 10kb to prevent rounding up errors
-            # in normalize_size()
-            o_num = to_bytes(o) + 1073741824
-            o = _size(o_num)
-
-    if s_num == -1 and isinstance(s,(_size,)):
-        s = _size(s.__add__(_size("1gb")))
-    if o_num == -1 and isinstance(o,(_size,)):
-        o = _size(o.__add__(_size("1gb")))
-
-    l = [s,o]
-    return l
+    return size_value(sz)[0]
+
+# _SIZE_SUFFIX: the size suffix for each power of 2 (shift) in a size value.
+_SIZE_SUFFIX = {0: "", 10: "k", 20: "m", 30: "g", 40: "t", 50: "p"}
+_SIZE_SHIFT = {"k": 10, "m": 20, "g": 30, "t": 40, "p": 50}
+
+_WORDSIZE = None
+
+# _wordsize: returns the number of bytes in a word, as used by size values
+# given in words.
+def _wordsize():
+    global _WORDSIZE
+    if _WORDSIZE is None:
+        _WORDSIZE = _pbs_v1.wordsize()
+    return _WORDSIZE
+
+# size_value: given a _size 'sz' value, returns a tuple (bytes, shift, words)
+# where 'bytes' is the equivalent number of bytes, 'shift' the power of 2
+# of its suffix (0, 10 for k, ... 50 for p) and 'words' True if 'sz' is
+# expressed in words.
+def size_value(sz):
+
+    s_str = str(sz).lower()
+    words = s_str.endswith("w")
+    s_str = s_str.rstrip("bw")
+    shift = _SIZE_SHIFT.get(s_str[-1:], 0)
+    if shift:
+        s_str = s_str[:-1]
+    nbytes = int(s_str) << shift
+    if words:
+        nbytes *= _wordsize()
+    return (nbytes, shift, words)
 
 def size_to_kbytes(sz):
     """
@@ -411,126 +548,93 @@ class size(_size):
 
     _derived_types = (_size,)
 
-    def __lt__(self,other):
-        so = transform_sizes(self,other)
-        s = so[0]
-        o = so[1]
-
-        s_str = str(s).rstrip("bB")
-        o_str = str(o).rstrip("bB")
-	
-        if s_str.isdigit() and o_str.isdigit():
-            return(int(s_str) < int(o_str))
+    # _bytes: the value in bytes, _shift: the power of 2 of its suffix
+    # (0 for none, 10 for k, ... 50 for p), _words: True if given in words.
+    # These are computed once, and used for all comparisons and arithmetic.
+    __slots__ = ('_bytes', '_shift', '_words')
 
-        # uses _size's richcompare
-        return s.__lt__(o)
+    def __init__(self, value):
+        super(size, self).__init__(value)
+        (self._bytes, self._shift, self._words) = size_value(self)
 
-    def __le__(self,other):
-        so = transform_sizes(self,other)
-        s = so[0]
-        o = so[1]
+    def _other_bytes(self, other):
+        """
+        Returns the number of bytes in 'other' if it is an int, long or
+        size, or None if it cannot be compared with a size.
+        """
+        if isinstance(other, size):
+            return other._bytes
+        if isinstance(other, (int, long)):
+            return other
+        if isinstance(other, _size):
+            return size_value(other)[0]
+        return None
 
-        s_str = str(s).rstrip("bB")
-        o_str = str(o).rstrip("bB")
-	
-        if s_str.isdigit() and o_str.isdigit():
-            return(int(s_str) <= int(o_str))
+    def __lt__(self,other):
+        o = self._other_bytes(other)
+        return (o is not None) and (self._bytes < o)
 
-        # uses _size's richcompare
-        return s.__le__(o)
+    def __le__(self,other):
+        o = self._other_bytes(other)
+        return (o is not None) and (self._bytes <= o)
 
     def __gt__(self,other):
-        so = transform_sizes(self,other)
-        s = so[0]
-        o = so[1]
-
-        s_str = str(s).rstrip("bB")
-        o_str = str(o).rstrip("bB")
-	
-        if s_str.isdigit() and o_str.isdigit():
-            return(int(s_str) > int(o_str))
-
-        # uses _size's richcompare
-        return s.__gt__(o)
+        o = self._other_bytes(other)
+        return (o is not None) and (self._bytes > o)
 
     def __ge__(self,other):
-        so = transform_sizes(self,other)
-        s = so[0]
-        o = so[1]
-
-        s_str = str(s).rstrip("bB")
-        o_str = str(o).rstrip("bB")
-	
-        if s_str.isdigit() and o_str.isdigit():
-            return(int(s_str) >= int(o_str))
-
-        # uses _size's richcompare
-        return s.__ge__(o)
+        o = self._other_bytes(other)
+        return (o is not None) and (self._bytes >= o)
 
     def __eq__(self,other):
-        so = transform_sizes(self,other)
-        s = so[0]
-        o = so[1]
-
-        s_str = str(s).rstrip("bB")
-        o_str = str(o).rstrip("bB")
-	
-        if s_str.isdigit() and o_str.isdigit():
-            return(int(s_str) == int(o_str))
-
-        # uses _size's richcompare
-        return s.__eq__(o)
+        o = self._other_bytes(other)
+        return (o is not None) and (self._bytes == o)
 
     def __ne__(self,other):
         """
         This is called on a <self> != <other> comparison, where
         <self> is of size type.
         """
-        if not isinstance(other,(int,long,size)):
-	    # if <other> object is not of type 'int', 'long', or 'size',
-	    # then it cannot be transformed into size type.
-	    # So automatically this != comparison should return
-	    # True  - yes, they're not equal.
-            return True
-    	    
-        so = transform_sizes(self,other)
-        s = so[0]
-        o = so[1]
+        # if <other> object is not of type 'int', 'long', or 'size',
+        # then it cannot be transformed into size type.
+        # So automatically this != comparison should return
+        # True  - yes, they're not equal.
+        o = self._other_bytes(other)
+        return (o is None) or (self._bytes != o)
 
-        s_str = str(s).rstrip("bB")
-        o_str = str(o).rstrip("bB")
-	
-        if s_str.isdigit() and o_str.isdigit():
-            return(int(s_str) != int(o_str))
+    def __hash__(self):
+        return hash(self._bytes)
 
-        # uses _size's richcompare
-        return s.__ne__(o)
+    def _result(self, other, nbytes):
+        """
+        Returns 'nbytes' as a size expressed the way _size arithmetic
+        expresses the result of an operation between self and 'other':
+        in the smaller suffix of the two, and in words only if both are.
+        """
+        if isinstance(other, size):
+            shift = min(self._shift, other._shift)
+            words = self._words and other._words
+        else:
+            shift = 0
+            words = False
+        if words:
+            return size("%d%sw" % ((nbytes / _wordsize()) >> shift,
+                                   _SIZE_SUFFIX[shift]))
+        return size("%d%sb" % (nbytes >> shift, _SIZE_SUFFIX[shift]))
 
     def __add__(self,other):
-        s = self
-        o = other 
-        if isinstance(self,(int,long,size)):
-            s = _size(str(self))
-        if isinstance(other,(int,long,size)):
-            o = _size(str(other))
-	# uses _size's add function, but trick is return
-	# the "size" type so that any comparisons with the
-	# return would look in here for comparison operators
-	# and not in _size's richcompare.
-        return size(s.__add__(o))
+        o = self._other_bytes(other)
+        if o is None:
+            return NotImplemented
+        return self._result(other, self._bytes + o)
 
     def __sub__(self,other):
-        s = self
-        o = other 
-        if isinstance(self,(int,long,size)):
-            s = _size(str(self))
-        if isinstance(other,(int,long,size)):
-            o = _size(str(other))
-	# uses _size's subtract function, but trick is return
-	# the "size" type so that any comparisons with the
-	# return would look in here for comparison operators
-	# and not in _size's richcompare.
-        return size(s.__sub__(o))
+        o = self._other_bytes(other)
+        if o is None:
+            return NotImplemented
+        if o > self._bytes:
+            raise ArithmeticError("expression evaluates to negative _size value")
+        return self._result(other, self._bytes - o)
 
     def __deepcopy__(self, mem):
         return size(str(self))
@@ -896,6 +1000,31 @@ class select(_generic_attr):
         _pbs_v1.validate_input("resc", "select", value)
         super(select,self).__init__(value)
 
+    def _parsed(self):
+        """
+        Returns the select value as a list of (<chunk_ct>, <spec>) tuples,
+        one per plus-separated chunk, where <spec> is the
+        "<res1>=<val1>:<res2>=<val2>..." part of the chunk (None if the
+        chunk only gives a count). The list is built once and rebuilt only
+        when the select value changes.
+        """
+        if self.__dict__.get('_parsed_value') is not self._value:
+            parsed = []
+            for chunk in str(self).split("+"):
+                (ct, sep, spec) = chunk.partition(":")
+                if ct.isdigit():
+                    if not sep:
+                        spec = None
+                    parsed.append((int(ct), spec))
+                else:
+                    # detected a first field that is not
+                    # a <chunk_ct>, so default to 1
+                    parsed.append((1, chunk))
+            self._parsed_chunks = parsed
+            self._parsed_value = self._value
+        return self._parsed_chunks
+    #: m(_parsed)
+
     def increment_chunks(self, increment_spec):
         """
         Given a pbs.select value (i.e. <num>:r1=v1:r2=v2+...+<num>:rn=vN),
@@ -986,64 +1115,46 @@ class select(_generic_attr):
         else:
             raise ValueError("bad increment specs")
   
-        ret_str = ""
+        chunks = []
         i = 0 # index to each chunk in the + separated spec
-        for chunk in str(self).split("+"):
-            if i != 0:
-                ret_str += '+'
-            j = 0 # index to items within a chunk separated by ':'
-            for subchunk in chunk.split(":"):
-                c_str = subchunk
-                if j == 0:
-                    # given <chunk_ct>:<res1>=<val1>:<res2>=<val2> or
-                    # <res1>=<val1>:<res2>:<val2> (without <chunk_ct>),
-                    # here we're looking at the first field:
-                    # subchunk=<chunk_ct> or subchunk=<res1>=<val1>
-                    save_str = None
-                    if not subchunk.isdigit():
-                        # detected a first field that is not
-                        # a <chunk_ct>, so default to 1
-                        subchunk = "1"
-                        save_str = c_str
-                    chunk_ct = int(subchunk)
-
-                    if i == 0:
-                        chunk_ct -= 1 # don't touch the first chunk which lands in MS
-
-                    if chunk_ct <= 0:
-                        num = 0
-                    elif increment:
-                        num = chunk_ct + increment
-                    elif percent_inc:
-                        num = int(math.ceil(chunk_ct * percent_inc))
-                    elif increment_dict is not None and i in increment_dict:
-                        if isinstance(increment_dict[i], (int, long)):
-                            inc = increment_dict[i]
-                            num = chunk_ct + inc
-                        elif isinstance(increment_dict[i], str):
-                            if increment_dict[i].endswith('%'):
-                                p_inc = float(increment_dict[i][:-1])/100 + 1.0
-                                num = int(math.ceil(chunk_ct * p_inc))
-                            else:
-                                inc = int(increment_dict[i])
-                                num = chunk_ct + inc
+        for (chunk_ct, spec) in self._parsed():
+            # given <chunk_ct>:<res1>=<val1>:<res2>=<val2> or
+            # <res1>=<val1>:<res2>:<val2> (without <chunk_ct>, which
+            # then defaults to 1)
+            if i == 0:
+                chunk_ct -= 1 # don't touch the first chunk which lands in MS
+
+            if chunk_ct <= 0:
+                num = 0
+            elif increment:
+                num = chunk_ct + increment
+            elif percent_inc:
+                num = int(math.ceil(chunk_ct * percent_inc))
+            elif increment_dict is not None and i in increment_dict:
+                if isinstance(increment_dict[i], (int, long)):
+                    inc = increment_dict[i]
+                    num = chunk_ct + inc
+                elif isinstance(increment_dict[i], str):
+                    if increment_dict[i].endswith('%'):
+                        p_inc = float(increment_dict[i][:-1])/100 + 1.0
+                        num = int(math.ceil(chunk_ct * p_inc))
                     else:
-                        raise ValueError("bad increment specs")
+                        inc = int(increment_dict[i])
+                        num = chunk_ct + inc
+            else:
+                raise ValueError("bad increment specs")
 
-                    if (i == 0):
-                        num += 1 # put back the decremented count
+            if (i == 0):
+                num += 1 # put back the decremented count
 
-                    if save_str:
-                        c_str = "%s:%s" % (num,save_str)
-                    else:
-                        c_str = "%s" % (num)
-                else:
-                    ret_str += ":"
-                ret_str += c_str
-                j += 1
+            if spec is not None:
+                chunks.append("%s:%s" % (num, spec))
+            else:
+                chunks.append("%s" % (num))
 
             i += 1
 
+        ret_str = "+".join(chunks)
         return select(ret_str)
 
 class place(_generic_attr):
@@ -1429,8 +1540,9 @@ class pbs_resource(object):
     
     __resources = PbsReadOnlyDescriptor('__resources', {})
     attributes = __resources
-    _attributes_hook_set = {}
-    _attributes_unknown = {}
+    _attributes_lower = PbsReadOnlyDescriptor('_attributes_lower', {})
+    _attributes_hook_set = PbsInstanceDictDescriptor('_attributes_hook_set')
+    _attributes_unknown = PbsInstanceDictDescriptor('_attributes_unknown')
 
     def __new__(cls,value, is_entity=0):
         return object.__new__(cls, value, is_entity)
@@ -1468,10 +1580,9 @@ class pbs_resource(object):
 	
         d = pbs_resource.attributes.copy()
 
-        if pbs_resource._attributes_unknown.has_key(self):
-            # update pbs_resource list of attribute names to contain the
-            # "unknown" names as well.
-            d.update(pbs_resource._attributes_unknown[self])
+        # update pbs_resource list of attribute names to contain the
+        # "unknown" names as well.
+        d.update(self._attributes_unknown[self])
 
         for resc in d:
             if resc == '_name' or resc == '_has_value':
@@ -1528,19 +1639,13 @@ class pbs_resource(object):
             # resource instance is an entity resource type. 
 
             # resource names in PBS are case insensitive,
-            # so do caseless matching here.
-            found = False
-            namel = nameo.lower()
-            for resc in pbs_resource.attributes:
-                rescl = resc.lower()
-                if namel == rescl:
-                   # Need to use the matched name stored in PBS Python resource
-	           # table, to avoid resource ambiguity later on.
-                   name = resc
-                   found = True
-
-            if not found:
-
+            # so do caseless matching here. Need to use the matched name
+            # stored in PBS Python resource table, to avoid resource
+            # ambiguity later on.
+            resc = pbs_resource._attributes_lower.get(nameo.lower())
+            if resc is not None:
+                name = resc
+            else:
                 if _pbs_v1.in_python_mode():
                     # if attribute name not found,and executing inside Python script
                     if _pbs_v1.get_python_daemon_name() != "pbs_python":
@@ -1550,16 +1655,13 @@ class pbs_resource(object):
                     # we're in a mom hook, so no longer raising an exception here since if
                     # it's an unknown resource, we can now tell server to
                     # automatically add a custom resource.
-                    if not self._attributes_unknown.has_key(self):
-                        self._attributes_unknown[self] = {}
                     # add the current attribute name to the "unknown" list
                     self._attributes_unknown[self].update({name : None})
                 else:
-                    if not self._attributes_unknown.has_key(self):
-                        self._attributes_unknown[self] = {}
                     # add the current attribute name to the "unknown" list
                     self._attributes_unknown[self].update({name : None})
 
+        old = self.__dict__.get(name)
         super(pbs_resource,self).__setattr__(name, value)
 
         # attributes that are set in python mode will be reflected in
@@ -1569,10 +1671,9 @@ class pbs_resource(object):
         # if 'walltime' or 'mem' has been assigned a value within the hook
         # script, or been unset.
         if _pbs_v1.in_python_mode():
-            if not self._attributes_hook_set.has_key(self):
-                self._attributes_hook_set[self] = {}
-            # using a dictionary value as easier to search for keys
-            self._attributes_hook_set[self].update({name : None})
+            # the dictionary value is the resource value before the hook
+            # first set it
+            _hook_set_mark(self, name, old)
     #: m(__setattr__)
 
     def keys(self):
@@ -1604,16 +1705,40 @@ class vchunk(object):
         """__init__"""
 
         ch = achunk.split(":")
-        self.chunk_resources = pbs_resource("Resource_List")
+        self._resources = []
+        self._chunk_resources = None
         for c in ch:
             if c.find("=") == -1:
                 self.vnode_name = c
             else:
                 rs = c.split("=", 1)
                 descr = getattr(pbs_resource,rs[0])
-                self.chunk_resources[rs[0]] = descr._value_type[0](rs[1])
+                self._resources.append(
+                                (rs[0], descr._value_type[0](rs[1])))
     #: m(__init__)
 
+    def _get_chunk_resources(self):
+        """
+        Returns the chunk's resources as a pbs_resource, populated from the
+        typed values parsed in __init__ the first time it is accessed.
+        """
+        if self._chunk_resources is None:
+            chunk_resources = pbs_resource("Resource_List")
+            for (name, val) in self._resources:
+                chunk_resources[name] = val
+            self._chunk_resources = chunk_resources
+        return self._chunk_resources
+    #: m(_get_chunk_resources)
+
+    def _set_chunk_resources(self, value):
+        """_set_chunk_resources"""
+        self._chunk_resources = value
+    #: m(_set_chunk_resources)
+
+    chunk_resources = property(_get_chunk_resources, _set_chunk_resources)
+
+#: C(vchunk)
+
 class exec_vnode(_generic_attr):
     """
     Represents a PBS exec_vnodes
@@ -1630,14 +1755,50 @@ class exec_vnode(_generic_attr):
 	    ev.chunks[1].vnode_name = 'vnodeC'
 	    ev.chunks[1].vnode_resources = {  'mem' : pbs.size('Z') } 
 
+	    ev.vnode_chunks('vnodeB') returns the pbs.vchunk objects
+	    assigned from vnodeB.
+
     """
     _derived_types = (_generic_attr,)
     def __init__(self,value):
         _pbs_v1.validate_input("job", "exec_vnode", value)
         super(exec_vnode,self).__init__(value)
-        self.chunks = list()
-        vals = value.split("+")
-        i = 0
-        for v in vals:
-            self.chunks.append(vchunk(v.strip("(").strip(")")))
+        # Parse now so that unknown resources are reported here
+        self._get_chunks()
+
+    def _get_chunks(self):
+        """
+        Returns the list of pbs.vchunk objects for the exec_vnode value.
+        The list is built once and rebuilt only when the value changes.
+        """
+        if self.__dict__.get('_chunks_value') is not self._value:
+            chunks = list()
+            if self._value is not None:
+                for v in str(self).split("+"):
+                    chunks.append(vchunk(v.strip("(").strip(")")))
+            self._chunks = chunks
+            self._chunks_value = self._value
+        return self._chunks
+    #: m(_get_chunks)
+
+    def _set_chunks(self, value):
+        """_set_chunks"""
+        self._chunks = value
+        self._chunks_value = self._value
+    #: m(_set_chunks)
+
+    chunks = property(_get_chunks, _set_chunks)
+
+    def vnode_chunks(self, vnode_name):
+        """
+        Returns the list of pbs.vchunk objects assigned from 'vnode_name',
+        or an empty list if none are. The current chunk list is walked on
+        each call, so chunks added, removed or renamed in place are seen.
+        """
+        return [ch for ch in self._get_chunks()
+                if getattr(ch, "vnode_name", None) == vnode_name]
+    #: m(vnode_chunks)
+
+#: C(exec_vnode)
+
 #: --------         EXPORTED TYPES DICTIONARY                      ---------
@@ -44,8 +44,11 @@ This module captures all the python types representing the PBS Server objects
 (server,queue,job,resv, etc.)
 """
 from _base_types import (PbsAttributeDescriptor, PbsReadOnlyDescriptor,
+                         PbsInstanceDictDescriptor,
                          pbs_resource, pbs_bool, _LOG,
+                         _hook_set_mark,
                          )
+import weakref
 import _pbs_v1
 from _pbs_v1 import (_event_accept, _event_reject,
                     _event_param_mod_allow, _event_param_mod_disallow,
@@ -83,6 +86,199 @@ def get_local_nodename():
         return(_pbs_v1.get_local_host_name())
 
 
+#
+# _pbs_connections: connection handles opened by pbs_statobj(), keyed by the
+#            name of the server connected to. A handle is reused by every
+#            pbs.server() lookup made during the current hook invocation,
+#            and all of them are closed by pbs_disconnect_all() when the
+#            hook invocation (i.e. the pbs_python process) ends.
+_pbs_connections = {}
+
+#
+# pbs_server_connect: returns a connection handle to 'connect_server' (or
+#            "localhost" if None), reusing the one opened earlier in this
+#            hook invocation if there is one. Returns a negative value if
+#            no connection could be made.
+def pbs_server_connect(connect_server=None):
+        """
+        Returns a connection handle to 'connect_server', opening it only
+        if this hook invocation does not hold one already.
+        """
+        if( connect_server == None ):
+            connect_server = "localhost"
+
+        con = _pbs_connections.get(connect_server, -1)
+        if con < 0:
+            con = pbs_connect(connect_server)
+            if con >= 0:
+                _pbs_connections[connect_server] = con
+        return con
+
+#
+# pbs_server_disconnect: closes the cached connection to 'connect_server'
+#            (or "localhost" if None), so the next pbs_server_connect()
+#            call opens a new one.
+def pbs_server_disconnect(connect_server=None):
+        """
+        Closes the cached connection handle to 'connect_server', if any.
+        """
+        if( connect_server == None ):
+            connect_server = "localhost"
+
+        con = _pbs_connections.pop(connect_server, -1)
+        if con >= 0:
+            pbs_disconnect(con)
+
+#
+# pbs_disconnect_all: closes every connection cached by pbs_server_connect().
+def pbs_disconnect_all():
+        """
+        Closes all the connection handles cached during this hook invocation.
+        """
+        for connect_server in _pbs_connections.keys():
+            pbs_server_disconnect(connect_server)
+
+try:
+    import atexit
+    atexit.register(pbs_disconnect_all)
+except:
+    pass
+
+#
+# pbs_attrl: returns a tuple (head, nodes) where 'head' is a PBS attribute
+#            list (struct attrl) naming each entry in 'attribs', to be
+#            passed to the pbs_stat*() calls, and 'nodes' holds every
+#            element of that list so that they are not freed before the
+#            call returns. An entry of the form "<attr>.<resource>"
+#            requests a single resource of <attr>. Returns (None, []) if
+#            'attribs' is None or empty, meaning all attributes.
+def pbs_attrl(attribs):
+        """
+        Converts a list of attribute names into a PBS attribute list.
+        """
+        if not attribs:
+            return (None, [])
+
+        if isinstance(attribs, str):
+            attribs = [attribs]
+
+        nodes = []
+        prev = None
+        for name in attribs:
+            a = attrl()
+            if '.' in name:
+                (a.name, a.resource) = name.split('.', 1)
+            else:
+                a.name = name
+            a.value = ""
+            a.next = None
+            if prev != None:
+                prev.next = a
+            prev = a
+            nodes.append(a)
+        return (nodes[0], nodes)
+
+#
+# pbs_attrl_items: returns a generator of (name, resource, value) tuples
+#            taken from the PBS attribute list 'a' (struct attrl).
+def pbs_attrl_items(a):
+        """
+        Yields the (name, resource, value) of each element of attribute
+        list 'a'.
+        """
+        while(a):
+            yield (a.name, a.resource, a.value)
+            a=a.next
+
+#
+# pbs_new_object: returns a new object of 'type' ("job", "queue", "resv",
+#            "vnode", "server") named 'name', with no attributes set.
+def pbs_new_object(type, name, connect_server=None):
+        """
+        Returns a new _job, _queue, _resv, _vnode or _server object.
+        """
+        if( type == "job" ):
+            return _job(name, connect_server)
+        elif( type == "queue" ):
+            return _queue(name, connect_server)
+        elif( type == "vnode" ):
+            return _vnode(name, connect_server)
+        elif( type == "resv" ):
+            return _resv(name, connect_server)
+        elif( type == "server" ):
+            return _server(name, connect_server)
+        raise ValueError("Bad object type %s" % (type,))
+
+#
+# pbs_set_attribs: sets on 'obj', a new object of 'type' ("job", "queue",
+#            "resv", "vnode", "server"), the attribute values given by
+#            'items', a sequence of (name, resource, value) as returned by
+#            pbs_stat*(). Values of the same attribute/resource are joined
+#            with commas. Returns False, leaving 'obj' partially set, if
+#            'obj' is a job that is not in queue 'filter_queue'.
+#            NOTE: must be called in C mode.
+def pbs_set_attribs(obj, type, items, header_str, server_data_fp=None,
+                    filter_queue=None):
+        """
+        Populates 'obj' with the (name, resource, value) entries in 'items'.
+        """
+        for (n, r, v) in items:
+            if( type == "vnode" ):
+                if( n == ATTR_NODE_state ):
+                    v=_pbs_v1.str_to_vnode_state(v)
+                elif( n == ATTR_NODE_ntype ):
+                    v=_pbs_v1.str_to_vnode_ntype(v)
+                elif( n == ATTR_NODE_Sharing ):
+                    v=_pbs_v1.str_to_vnode_sharing(v)
+
+            elif( type == "job" ):
+                if( (filter_queue != None) and (n == ATTR_queue) and \
+                                      (filter_queue != v) ):
+                    return False
+                if n == ATTR_inter or n == ATTR_block or n == ATTR_X11_port:
+                    v=int(pbs_bool(v))
+
+            if(r):
+                pr=getattr(obj,n)
+
+                # instantiate Resource_List object if not set
+                if( pr == None):
+                    setattr(obj,n)
+
+                pr=getattr(obj,n)
+                if (pr == None):
+                    _pbs_v1.logmsg(_pbs_v1.LOG_DEBUG,
+                                     "pbs_statobj: missing %s" % (n))
+                    continue
+
+                vo=getattr(pr, r)
+                if( vo == None ):
+                    setattr(pr,r,v)
+                    if server_data_fp:
+                        server_data_fp.write("%s.%s[%s]=%s\n" %(header_str,n,r,v))
+                else:
+                    # append value...
+                    # example: "select=1:ncpus=1,ncpus=1,nodect=1,place=pack"
+                    vl=[vo, v]
+                    setattr(pr, r, ",".join(vl))
+                    if server_data_fp:
+                        server_data_fp.write("%s.%s[%s]=%s\n" % (header_str, n,r,",".join(vl)))
+
+            else:
+                vo=getattr(obj,n)
+
+                if( vo == None ):
+                    setattr(obj,n,v)
+                    if server_data_fp:
+                        server_data_fp.write("%s.%s=%s\n" %(header_str,n,v))
+                else:
+                    # append value
+                    vl=[vo, v]
+                    setattr(obj, n, ",".join(vl))
+                    if server_data_fp:
+                        server_data_fp.write("%s.%s=%s\n" % (header_str, n, ",".join(vl)))
+        return True
+
 #
 # pbs_statobj: general-purpose function that connects to server named
 #           'connect_server' or if None, use "localhost", and depending
@@ -93,7 +289,10 @@ def get_local_nodename():
 #            NOTE: 'filter_queue' is used for a "job" type, which means
 #                  the job must be in the queue 'filter_queue' for the
 #                  job object to be instantiated.
-def pbs_statobj(type, name=None, connect_server=None, filter_queue=None):
+#            NOTE: the connection to 'connect_server' is kept open and
+#                  reused by later calls within the same hook invocation.
+def pbs_statobj(type, name=None, connect_server=None, filter_queue=None,
+                attribs=None):
         """
         Returns a PBS (e.g. _job, _queue, _resv, _vnode, _server) object
         that is populated with data obtained by calling PBS APIs:
@@ -109,134 +308,84 @@ def pbs_statobj(type, name=None, connect_server=None, filter_queue=None):
         'filter_queue' is used for a "job" type, which means
         the job must be in the queue 'filter_queue' for the
         job object to be instantiated.
+
+        'attribs' is an optional list of attribute names (e.g.
+        ["state", "resources_available"]) to restrict the query to;
+        the other attributes of the returned object are left unset.
+        If None, all attributes are obtained.
         """
 
         _pbs_v1.set_c_mode()
 
         server_data_fp = _pbs_v1.get_server_data_fp();
 
-        if( connect_server == None ):
-            con=pbs_connect("localhost")
-        else:
-            con=pbs_connect(connect_server)
-
-        if con < 0:
-            _pbs_v1.logmsg(_pbs_v1.LOG_DEBUG,\
-               "pbs_statobj: Unable to connect to server %s" % (connect_server))
-            _pbs_v1.set_python_mode()
-            return None
-
         if( type == "job" ):
-            bs=pbs_statjob(con, name, None, None)
             header_str = "pbs.server().job(%s)" % (name,)
         elif( type == "queue" ):
-            bs=pbs_statque(con, name, None, None)
             header_str = "pbs.server().queue(%s)" % (name,)
         elif( type == "vnode" ):
-            bs=pbs_statvnode(con, name, None, None)
             header_str = "pbs.server().vnode(%s)" % (name,)
         elif( type == "resv" ):
-            bs=pbs_statresv(con, name, None, None)
             header_str = "pbs.server().resv(%s)" % (name,)
         elif( type == "server" ):
-            bs=pbs_statserver(con, None, None)
             header_str = "pbs.server()"
         else:
             _pbs_v1.logmsg(_pbs_v1.LOG_DEBUG, "pbs_statobj: Bad object type %s" % (type))
-            pbs_disconnect(con)
             _pbs_v1.set_python_mode()
             return None
 
-        b = bs
-        obj = None
-        while(b):
+        if attribs and (type == "job") and (filter_queue != None):
+            if isinstance(attribs, str):
+                attribs = [attribs]
+            attribs = list(attribs) + [ATTR_queue]
+        (attrib_list, attrib_nodes) = pbs_attrl(attribs)
+
+        # A cached connection may have been dropped by the server since
+        # its last use, so a query on one that got no reply is retried
+        # once on a fresh connection. An error message means the server
+        # did reply (e.g. the object does not exist): no retry then.
+        for retry in (True, False):
+            if( connect_server == None ):
+                reused = _pbs_connections.has_key("localhost")
+            else:
+                reused = _pbs_connections.has_key(connect_server)
+            con = pbs_server_connect(connect_server)
+
+            if con < 0:
+                _pbs_v1.logmsg(_pbs_v1.LOG_DEBUG,\
+                   "pbs_statobj: Unable to connect to server %s" % (connect_server))
+                _pbs_v1.set_python_mode()
+                return None
+
             if( type == "job" ):
-                obj=_job(b.name, connect_server)
+                bs=pbs_statjob(con, name, attrib_list, None)
             elif( type == "queue" ):
-                obj=_queue(b.name, connect_server)
+                bs=pbs_statque(con, name, attrib_list, None)
             elif( type == "vnode" ):
-                obj=_vnode(b.name, connect_server)
+                bs=pbs_statvnode(con, name, attrib_list, None)
             elif( type == "resv" ):
-                obj=_resv(b.name, connect_server)
-            elif( type == "server" ):
-                obj=_server(b.name, connect_server)
+                bs=pbs_statresv(con, name, attrib_list, None)
             else:
-                _pbs_v1.logmsg(_pbs_v1.LOG_DEBUG,
-                                 "pbs_statobj: Bad object type %s" % (type))
-                pbs_disconnect(con)
-                _pbs_v1.set_python_mode()
-                return None
+                bs=pbs_statserver(con, attrib_list, None)
 
-            a=b.attribs
-
-            while(a):
-                n=a.name
-                r=a.resource
-                v=a.value
-
-                if( type == "vnode" ):        
-                    if( n == ATTR_NODE_state ):         
-                        v=_pbs_v1.str_to_vnode_state(v)         
-                    elif( n == ATTR_NODE_ntype ): 
-                        v=_pbs_v1.str_to_vnode_ntype(v)         
-                    elif( n == ATTR_NODE_Sharing ): 
-                        v=_pbs_v1.str_to_vnode_sharing(v)
-
-                elif( type == "job" ):
-                    if( (filter_queue != None) and (n == ATTR_queue) and \
-                                          (filter_queue != v) ):
-                        pbs_disconnect(con)
-                        _pbs_v1.set_python_mode()
-                        return None
-                    if n == ATTR_inter or n == ATTR_block or n == ATTR_X11_port:
-                        v=int(pbs_bool(v))
-
-                if(r):
-                    pr=getattr(obj,n)
-
-                    # instantiate Resource_List object if not set
-                    if( pr == None):
-                        setattr(obj,n)
-
-                    pr=getattr(obj,n)
-                    if (pr == None):
-                        _pbs_v1.logmsg(_pbs_v1.LOG_DEBUG,
-                                         "pbs_statobj: missing %s" % (n))
-                        a=a.next
-                        continue
-
-                    vo=getattr(pr, r)
-                    if( vo == None ):
-                        setattr(pr,r,v)
-                        if server_data_fp:
-                            server_data_fp.write("%s.%s[%s]=%s\n" %(header_str,n,r,v))
-                    else:
-                        # append value...
-                        # example: "select=1:ncpus=1,ncpus=1,nodect=1,place=pack"
-                        vl=[vo, v]
-                        setattr(pr, r, ",".join(vl))        
-                        if server_data_fp:
-                            server_data_fp.write("%s.%s[%s]=%s\n" % (header_str, n,r,",".join(vl)))
-
-                else:
-                    vo=getattr(obj,n)
+            if bs or not (retry and reused) or \
+               (pbs_geterrmsg(con) != None):
+                break
+            pbs_server_disconnect(connect_server)
 
-                    if( vo == None ):
-                        setattr(obj,n,v)
-                        if server_data_fp:
-                            server_data_fp.write("%s.%s=%s\n" %(header_str,n,v))
-                    else:
-                        # append value        
-                        vl=[vo, v]
-                        setattr(obj, n, ",".join(vl))
-                        if server_data_fp:
-                            server_data_fp.write("%s.%s=%s\n" % (header_str, n, ",".join(vl)))
-
-                a=a.next
+        b = bs
+        obj = None
+        while(b):
+            obj = pbs_new_object(type, b.name, connect_server)
+            if not pbs_set_attribs(obj, type, pbs_attrl_items(b.attribs),
+                                   header_str, server_data_fp, filter_queue):
+                pbs_statfree(bs)
+                _pbs_v1.set_python_mode()
+                return None
   
             b=b.next
 
-        pbs_disconnect(con)
+        pbs_statfree(bs)
         _pbs_v1.set_python_mode()
         return obj 
 
@@ -244,6 +393,67 @@ def pbs_statobj(type, name=None, connect_server=None, filter_queue=None):
 # Allow the C implementation of hooks to call pbs_statobj function.
 _pbs_v1.set_pbs_statobj(pbs_statobj)
 
+#
+# _pbs_stat_cache: objects obtained by pbs_statobj() on behalf of the
+#            pbs.server() lookups of the current event, keyed by
+#            (type, name, connect_server, attribs). _pbs_stat_cache_event
+#            refers (weakly) to the event these entries were obtained for:
+#            the cache is emptied by the first lookup made for another event.
+_pbs_stat_cache = {}
+_pbs_stat_cache_event = None
+
+#
+# pbs_statobj_cached: same as pbs_statobj() but returns the object obtained
+#            by an earlier call for the same event, if any. An object
+#            obtained with all of its attributes also satisfies a request
+#            for a subset of them. If 'fresh' is True, the server is
+#            queried regardless and the cached object is replaced.
+def pbs_statobj_cached(type, name=None, connect_server=None, attribs=None,
+                       fresh=False):
+        """
+        Returns the PBS object of 'type' named 'name' like pbs_statobj(),
+        reusing the result of an earlier identical query within the
+        current event unless 'fresh' is True.
+        """
+        global _pbs_stat_cache, _pbs_stat_cache_event
+
+        ev = _pbs_v1.event()
+        if (_pbs_stat_cache_event == None) or (_pbs_stat_cache_event() is not ev):
+            _pbs_stat_cache = {}
+            try:
+                _pbs_stat_cache_event = weakref.ref(ev)
+            except TypeError:
+                _pbs_stat_cache_event = lambda: ev
+
+        if isinstance(attribs, str):
+            attribs = [attribs]
+        if attribs:
+            attribs = tuple(attribs)
+        else:
+            attribs = None
+
+        key = (type, name, connect_server, attribs)
+        if not fresh:
+            obj = _pbs_stat_cache.get(key)
+            if (obj == None) and (attribs != None):
+                obj = _pbs_stat_cache.get((type, name, connect_server, None))
+            if obj != None:
+                return obj
+
+        obj = pbs_statobj(type, name, connect_server, attribs=attribs)
+        if obj != None:
+            _pbs_stat_cache[key] = obj
+        return obj
+
+#
+# pbs_statobj_cache_clear: discards all the objects kept by
+#            pbs_statobj_cached().
+def pbs_statobj_cache_clear():
+        """
+        Empties the cache of objects used by pbs_statobj_cached().
+        """
+        _pbs_stat_cache.clear()
+
 #:------------------------------------------------------------------------
 #                       JOB TYPE
 #:-------------------------------------------------------------------------
@@ -253,7 +463,7 @@ class _job(object):
     """
 
     attributes = PbsReadOnlyDescriptor('attributes', {})
-    _attributes_hook_set = {}
+    _attributes_hook_set = PbsInstanceDictDescriptor('_attributes_hook_set')
 
     def __new__(cls,value,connect_server=None):
         return object.__new__(cls, value)
@@ -292,6 +502,7 @@ class _job(object):
                                  not _job.attributes.has_key(name)):
             raise UnsetAttributeNameError("job attribute '%s' not found" % (name,))
 
+        old = self.__dict__.get(name)
         super(_job,self).__setattr__(name, value)
 
         # attributes that are set in python mode will be reflected in
@@ -302,10 +513,9 @@ class _job(object):
         # script, or been unset.
 
         if _pbs_v1.in_python_mode():
-            if not self._attributes_hook_set.has_key(self):
-                self._attributes_hook_set[self] = {}
-            # using a dictionary value as easier to search for keys
-            self._attributes_hook_set[self].update({name : None})
+            # the dictionary value is the attribute value before the hook
+            # first set it
+            _hook_set_mark(self, name, old)
         
     #: m(__setattr__)        
 
@@ -373,7 +583,7 @@ class _vnode(object):
     """
 
     attributes = PbsReadOnlyDescriptor('attributes', {})
-    _attributes_hook_set = {}
+    _attributes_hook_set = PbsInstanceDictDescriptor('_attributes_hook_set')
 
     def __new__(cls,value,connect_server=None):
         return object.__new__(cls, value)
@@ -399,6 +609,7 @@ class _vnode(object):
                  raise BadAttributeValueError("_readonly can only be set to True!")
         elif not _vnode.attributes.has_key(name):
             raise UnsetAttributeNameError("vnode attribute '%s' not found" % (name,))
+        old = self.__dict__.get(name)
         super(_vnode,self).__setattr__(name, value)
 
         # attributes that are set in python mode will be reflected in
@@ -409,10 +620,9 @@ class _vnode(object):
         # script, or been unset.
 
         if _pbs_v1.in_python_mode() and (name != "_connect_server"):
-            if not self._attributes_hook_set.has_key(self):
-                self._attributes_hook_set[self] = {}
-            # using a dictionary value as easier to search for keys
-            self._attributes_hook_set[self].update({name : None})
+            # the dictionary value is the attribute value before the hook
+            # first set it
+            _hook_set_mark(self, name, old)
             _pbs_v1.mark_vnode_set(self.name, name, str(value))        
         
     #: m(__seattr__)        
@@ -434,7 +644,7 @@ class _resv(object):
     """
     
     attributes = PbsReadOnlyDescriptor('attributes', {})
-    _attributes_hook_set = {}
+    _attributes_hook_set = PbsInstanceDictDescriptor('_attributes_hook_set')
     attributes_readonly = PbsReadOnlyDescriptor('attributes_readonly',
                         [])
     
@@ -467,6 +677,7 @@ class _resv(object):
                                                 _pbs_v1.in_site_hook():
             # readonly under a SITE hook
             raise BadAttributeValueError("resv attribute '%s' is readonly" % (name,))
+        old = self.__dict__.get(name)
         super(_resv,self).__setattr__(name, value)
 
         # attributes that are set in python mode will be reflected in
@@ -477,10 +688,9 @@ class _resv(object):
         # the hook script, or been unset.
 
         if _pbs_v1.in_python_mode():
-            if not self._attributes_hook_set.has_key(self):
-                self._attributes_hook_set[self] = {}
-            # using a dictionary value as easier to search for keys
-            self._attributes_hook_set[self].update({name : None})
+            # the dictionary value is the attribute value before the hook
+            # first set it
+            _hook_set_mark(self, name, old)
     #: m(__setattr__)
     
 #: C(resv)
@@ -522,8 +732,11 @@ class _queue(object):
         super(_queue,self).__setattr__(name, value)
     #: m(__setattr__)
 
-    def job(self, jobid):
-        """Return a job object representing jobid that belongs to queue"""
+    def job(self, jobid, attribs=None):
+        """
+        Return a job object representing jobid that belongs to queue.
+        If 'attribs' is given, only the listed attributes are obtained.
+        """
 
         if jobid.find(".") == -1:
             jobid = jobid + "." + _pbs_v1.get_pbs_server_name()
@@ -543,16 +756,19 @@ class _queue(object):
                 return _pbs_v1.get_job_static(jobid, sn, qn);
 
             return pbs_statobj("job", jobid, self._connect_server,
-                                                            self.name)
+                                                    self.name, attribs)
         else:
             return _pbs_v1.get_job(jobid, self.name)
     #: m(job)
 
-    def jobs(self):
+    def jobs(self, attribs=None, batch_size=None):
         """
             Returns an iterator that loops over the list of jobs on this queue.
+            If 'attribs' (list of attribute names to obtain) or 'batch_size'
+            is given, the jobs are streamed (see pbs_stream_iter).
         """
-        return pbs_iter("jobs", "",  self.name, self._connect_server)
+        return pbs_iter_objects("jobs", self.name, self._connect_server,
+                                attribs, batch_size)
     #: m(jobs)
     
 #: C(_queue)
@@ -586,10 +802,14 @@ class _server(object):
         return str(self.name)
     #: m(__str__)
 
-    def queue(self, qname):
+    def queue(self, qname, attribs=None, fresh=False):
         """
-        queue(strQname)
+        queue(strQname[, attribs[, fresh]])
             strQname -  name of a PBS queue (without the @host part) to query.
+            attribs  -  optional list of attribute names to obtain, e.g.
+                        ["state_count"]; other attributes are left unset.
+            fresh    -  if True, query the server even if the queue was
+                        already obtained during this event.
 
           Returns a queue object representing the queue <queue name> that is
           managed by server s.
@@ -606,15 +826,21 @@ class _server(object):
                     sn = self._connect_server
                 return _pbs_v1.get_queue_static(qname, sn);
 
-            return pbs_statobj("queue", qname, self._connect_server)
+            return pbs_statobj_cached("queue", qname, self._connect_server,
+                                      attribs, fresh)
         else:        
             return _pbs_v1.get_queue(qname)
     #: m(queue)
 
-    def job(self, jobid):
+    def job(self, jobid, attribs=None, fresh=False):
         """
-        job(strJobid)
+        job(strJobid[, attribs[, fresh]])
             strJobid - PBS jobid to query.
+            attribs  - optional list of attribute names to obtain, e.g.
+                       ["job_state", "Resource_List.select"]; other
+                       attributes are left unset.
+            fresh    - if True, query the server even if the job was
+                       already obtained during this event.
           Returns a job object representing jobid
         """
         if jobid.find(".") == -1:
@@ -628,15 +854,21 @@ class _server(object):
                     sn = self._connect_server
                 return _pbs_v1.get_job_static(jobid, sn, "");
 
-            return pbs_statobj("job", jobid, self._connect_server)
+            return pbs_statobj_cached("job", jobid, self._connect_server,
+                                      attribs, fresh)
         else:
             return _pbs_v1.get_job(jobid)
     #: m(job)
 
-    def vnode(self, vname):
+    def vnode(self, vname, attribs=None, fresh=False):
         """
-        vnode(strVname)
+        vnode(strVname[, attribs[, fresh]])
             strVname - PBS vnode name to query.
+            attribs  - optional list of attribute names to obtain, e.g.
+                       ["state", "resources_available"]; other attributes
+                       are left unset.
+            fresh    - if True, query the server even if the vnode was
+                       already obtained during this event.
           Returns a vnode object representing vname 
         """
         if _pbs_v1.get_python_daemon_name() == "pbs_python":
@@ -647,13 +879,19 @@ class _server(object):
                     sn = self._connect_server
                 return _pbs_v1.get_vnode_static(vname, sn);
 
-            return pbs_statobj("vnode", vname, self._connect_server)
+            return pbs_statobj_cached("vnode", vname, self._connect_server,
+                                      attribs, fresh)
         else:
             return _pbs_v1.get_vnode(vname)
     #: m(vnode)
 
-    def resv(self, resvid):
-        """Return a resv object representing resvid"""
+    def resv(self, resvid, attribs=None, fresh=False):
+        """
+        Return a resv object representing resvid.
+        If 'attribs' is given, only the listed attributes are obtained.
+        If 'fresh' is True, the server is queried even if the reservation
+        was already obtained during this event.
+        """
                  
         if _pbs_v1.get_python_daemon_name() == "pbs_python":
             if _pbs_v1.use_static_data():
@@ -663,7 +901,8 @@ class _server(object):
                     sn = self._connect_server
                 return _pbs_v1.get_resv_static(resvid, sn);
 
-            return pbs_statobj("resv", resvid, self._connect_server)
+            return pbs_statobj_cached("resv", resvid, self._connect_server,
+                                      attribs, fresh)
         else:
             return _pbs_v1.get_resv(resvid)
     #: m(resv)
@@ -682,35 +921,47 @@ class _server(object):
             return pbs_iter("jobs", "",  qname, self._connect_server, ignore_fin, username)
         #: m(jobs_nas)
     else:
-        def jobs(self):
+        def jobs(self, attribs=None, batch_size=None):
             """
             Returns an iterator that loops over the list of jobs on this server.
+            If 'attribs' (list of attribute names to obtain) or 'batch_size'
+            is given, the jobs are streamed (see pbs_stream_iter).
             """
 
-            return pbs_iter("jobs", "",  "", self._connect_server)
+            return pbs_iter_objects("jobs", "", self._connect_server,
+                                    attribs, batch_size)
         #: m(jobs)
 
-    def vnodes(self):
+    def vnodes(self, attribs=None, batch_size=None):
         """
             Returns an iterator that loops over the list of vnodes on this server.
+            If 'attribs' (list of attribute names to obtain) or 'batch_size'
+            is given, the vnodes are streamed (see pbs_stream_iter).
         """
 
-        return pbs_iter("vnodes", "",  "", self._connect_server)
+        return pbs_iter_objects("vnodes", "", self._connect_server,
+                                attribs, batch_size)
     #: m(vnodes)
 
-    def queues(self):
+    def queues(self, attribs=None, batch_size=None):
         """
         Returns an iterator that loops over the list of queues on this server.
+        If 'attribs' (list of attribute names to obtain) or 'batch_size'
+        is given, the queues are streamed (see pbs_stream_iter).
         """
-        return pbs_iter("queues", "",  "", self._connect_server)
+        return pbs_iter_objects("queues", "", self._connect_server,
+                                attribs, batch_size)
     #: m(queues)
 
-    def resvs(self):
+    def resvs(self, attribs=None, batch_size=None):
         """
         Returns an iterator that loops over the list of reservations on this
         server.
+        If 'attribs' (list of attribute names to obtain) or 'batch_size'
+        is given, the reservations are streamed (see pbs_stream_iter).
         """
-        return pbs_iter( "resvs", "", "", self._connect_server)
+        return pbs_iter_objects("resvs", "", self._connect_server,
+                                attribs, batch_size)
     #: m(resvs)
 
     def scheduler_restart_cycle(self):
@@ -1258,3 +1509,226 @@ class pbs_iter(object):
 		    return _pbs_v1.iter_nextfunc(self, 0, self.obj_name, self.filter1, self.filter2)
 #: C(pbs_iter)
 
+
+#:-------------------------------------------------------------------------
+#                       STREAMING ITERATOR TYPE
+#:-------------------------------------------------------------------------
+#
+# ITER_BATCH_SIZE: default number of objects pbs_stream_iter obtains from
+#            the server per request.
+ITER_BATCH_SIZE = 1000
+
+class pbs_stat_entry(object):
+    """
+    This is the lightweight object returned by pbs_stream_iter in place of
+    a _job, _queue, _resv or _vnode. It holds the object's name and its
+    attribute values as obtained from the server; the actual object is
+    only built the first time one of its attributes is accessed.
+    """
+    __slots__ = ('name', '_type', '_connect_server', '_items', '_obj')
+
+    def __init__(self, type, name, connect_server, items):
+        """__init__"""
+
+        self.name = name
+        self._type = type
+        self._connect_server = connect_server
+        self._items = items
+        self._obj = None
+    #: m(__init__)
+
+    def _decode(self):
+        """
+        Returns the _job, _queue, _resv or _vnode object represented by
+        this entry, building it on first use.
+        """
+        if self._obj is None:
+            header_str = "pbs.server().%s(%s)" % (self._type, self.name)
+            _pbs_v1.set_c_mode()
+            try:
+                obj = pbs_new_object(self._type, self.name,
+                                     self._connect_server)
+                pbs_set_attribs(obj, self._type, self._items, header_str,
+                                _pbs_v1.get_server_data_fp())
+            finally:
+                _pbs_v1.set_python_mode()
+            self._obj = obj
+            self._items = None
+        return self._obj
+    #: m(_decode)
+
+    def __getattr__(self, name):
+        return getattr(self._decode(), name)
+    #: m(__getattr__)
+
+    def __setattr__(self, name, value):
+        if name in pbs_stat_entry.__slots__:
+            super(pbs_stat_entry, self).__setattr__(name, value)
+        else:
+            setattr(self._decode(), name, value)
+    #: m(__setattr__)
+
+    def __str__(self):
+        """String representation of the object"""
+
+        return str(self.name)
+    #: m(__str__)
+
+#: C(pbs_stat_entry)
+
+class pbs_stream_iter(object):
+    """
+    This represents an iterator for looping over the jobs, queues, resvs
+    or vnodes of a server, from a hook run by pbs_python, without holding
+    all of them in memory at once:
+
+    - only the attributes named in 'attribs' (e.g. ["state",
+      "resources_available.ncpus"]) are obtained; all if None.
+    - jobs are obtained 'batch_size' at a time. Queues, reservations and
+      vnodes can only be queried all at once, but are converted to
+      Python 'batch_size' at a time.
+    - each object is returned as a pbs_stat_entry, which is decoded into
+      a _job, _queue, _resv or _vnode object only when one of its
+      attributes other than 'name' is accessed.
+
+    Pbs_filter2 is, for "jobs", the name of a queue to restrict the list
+    of jobs to.
+    """
+
+    def __init__(self, pbs_obj_name, pbs_filter2="", connect_server=None,
+                 attribs=None, batch_size=None):
+
+        self._bs = None
+        if pbs_obj_name not in ("jobs", "queues", "resvs", "vnodes"):
+            raise ValueError("Bad object iterator type %s" % (pbs_obj_name,))
+
+        self.type = pbs_obj_name[:-1]
+        self._filter = pbs_filter2
+        self._connect_server = connect_server
+        (self._attrib_list, self._attrib_nodes) = pbs_attrl(attribs)
+        self._batch_size = batch_size or ITER_BATCH_SIZE
+        self._batch = []
+        # for "jobs": the ids not yet obtained, otherwise: the status
+        # list returned by the server and the next element to convert.
+        self._jobids = None
+        self._b = None
+        self._done = False
+    #: m(__init__)
+
+    def __iter__(self):
+        return self
+
+    def next(self):
+        if not self._batch and not self._done:
+            self._fetch()
+        if not self._batch:
+            raise StopIteration
+        return self._batch.pop()
+    #: m(next)
+
+    def __del__(self):
+        if self._bs:
+            pbs_statfree(self._bs)
+            self._bs = None
+    #: m(__del__)
+
+    def _entries(self, b, count=-1):
+        """
+        Makes the pending batch the first 'count' entries (all if -1)
+        of status list 'b', and returns the next element of 'b'.
+        """
+        entries = []
+        while(b and count != 0):
+            entries.append(pbs_stat_entry(self.type, b.name,
+                                          self._connect_server,
+                                          list(pbs_attrl_items(b.attribs))))
+            b = b.next
+            count -= 1
+        entries.reverse()
+        self._batch = entries
+        return b
+    #: m(_entries)
+
+    def _fetch(self):
+        """Obtain the next batch of objects."""
+
+        con = pbs_server_connect(self._connect_server)
+        if con < 0:
+            _pbs_v1.logmsg(_pbs_v1.LOG_DEBUG,
+                "pbs_stream_iter: Unable to connect to server %s" % \
+                                                    (self._connect_server))
+            self._done = True
+            return
+
+        _pbs_v1.set_c_mode()
+        try:
+            if( self.type == "job" ):
+                self._fetch_jobs(con)
+            else:
+                if self._bs == None:
+                    if( self.type == "queue" ):
+                        self._bs=pbs_statque(con, None, self._attrib_list, None)
+                    elif( self.type == "vnode" ):
+                        self._bs=pbs_statvnode(con, None, self._attrib_list, None)
+                    else:
+                        self._bs=pbs_statresv(con, None, self._attrib_list, None)
+                    self._b = self._bs
+                self._b = self._entries(self._b, self._batch_size)
+                if not self._b:
+                    pbs_statfree(self._bs)
+                    self._bs = None
+                    self._done = True
+        finally:
+            _pbs_v1.set_python_mode()
+    #: m(_fetch)
+
+    def _fetch_jobs(self, con):
+        """
+        Obtain the next batch of jobs. The first call only lists the job
+        ids, which are then queried 'batch_size' at a time.
+        """
+        if self._jobids == None:
+            (ids_attrl, ids_nodes) = pbs_attrl([ATTR_state])
+            bs = pbs_statjob(con, self._filter, ids_attrl, None)
+            self._jobids = []
+            b = bs
+            while(b):
+                self._jobids.append(b.name)
+                b = b.next
+            pbs_statfree(bs)
+            self._jobids.reverse()
+
+        # Jobs may have finished since they were listed, so keep going
+        # until a batch yields something.
+        while not self._batch and self._jobids:
+            ids = self._jobids[-self._batch_size:]
+            del self._jobids[-self._batch_size:]
+            ids.reverse()
+            bs = pbs_statjob(con, ",".join(ids), self._attrib_list, None)
+            self._entries(bs)
+            pbs_statfree(bs)
+
+        if not self._jobids:
+            self._done = True
+    #: m(_fetch_jobs)
+
+#: C(pbs_stream_iter)
+
+#
+# pbs_iter_objects: returns an iterator over the 'pbs_obj_name' objects
+#            ("jobs", "queues", "resvs", "vnodes") of 'connect_server'.
+#            This is a pbs_stream_iter if 'attribs' or 'batch_size' is given
+#            and the hook is run by pbs_python without static data, and a
+#            pbs_iter otherwise.
+def pbs_iter_objects(pbs_obj_name, pbs_filter2, connect_server=None,
+                     attribs=None, batch_size=None):
+        """
+        Returns a pbs_stream_iter or a pbs_iter over the 'pbs_obj_name'
+        objects of 'connect_server'.
+        """
+        if (attribs or batch_size) and \
+                (_pbs_v1.get_python_daemon_name() == "pbs_python") and \
+                not _pbs_v1.use_static_data():
+            return pbs_stream_iter(pbs_obj_name, pbs_filter2, connect_server,
+                                   attribs, batch_size)
+        return pbs_iter(pbs_obj_name, "", pbs_filter2, connect_server)
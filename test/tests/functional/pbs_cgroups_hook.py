@@ -87,6 +87,22 @@ def systemd_escape(buf):
     return ret
 
 
+def expand_list(buf):
+    """
+    Expand a cpuset list such as "0-3,8,10-11" into a list of integers
+    """
+    ret = []
+    for item in buf.strip().split(','):
+        if not item:
+            continue
+        if '-' in item:
+            (first, last) = item.split('-', 1)
+            ret.extend(range(int(first), int(last) + 1))
+        else:
+            ret.append(int(item))
+    return ret
+
+
 @tags('mom', 'multi_node')
 class TestCgroupsHook(TestFunctional):
 
@@ -146,9 +162,20 @@ class TestCgroupsHook(TestFunctional):
 
         self.serverA = self.servers.values()[0].name
         self.paths = self.get_paths()
-        if not (self.paths['cpuset'] and self.paths['memory']):
+        self.cgroup2_path = self.get_cgroup2_path()
+        # The test_cgroup_v2_* tests only run on the cgroup v2 unified
+        # hierarchy, the other tests need the cgroup v1 hierarchies
+        if self._testMethodName.startswith('test_cgroup_v2_'):
+            if not self.cgroup2_path:
+                self.skipTest('cgroup v2 unified hierarchy not mounted alone')
+            self.swapctl = 'false'
+            if glob.glob(os.path.join(self.cgroup2_path, '*',
+                                      'memory.swap.max')):
+                self.swapctl = 'true'
+        elif not (self.paths['cpuset'] and self.paths['memory']):
             self.skipTest('cpuset or memory cgroup subsystem not mounted')
-        self.swapctl = is_memsw_enabled(self.paths['memsw'])
+        else:
+            self.swapctl = is_memsw_enabled(self.paths['memsw'])
         self.server.set_op_mode(PTL_CLI)
         self.server.cleanup_jobs(extend='force')
         if not self.iscray:
@@ -358,6 +385,10 @@ sleep 15
         self.sleep5_job = """#!/bin/bash
 #PBS -joe
 sleep 5
+"""
+        self.sleep300_job = """#!/bin/bash
+#PBS -joe
+sleep 300
 """
         self.eat_cpu_script = """#!/bin/bash
 #PBS -joe
@@ -695,6 +726,57 @@ sleep 300
         }
     }
 }
+"""
+        self.cfg_v2 = """{
+    "cgroup_prefix"         : "pbspro",
+    "exclude_hosts"         : [],
+    "exclude_vntypes"       : [],
+    "run_only_on_hosts"     : [],
+    "periodic_resc_update"  : true,
+    "vnode_per_numa_node"   : false,
+    "online_offlined_nodes" : true,
+    "use_hyperthreads"      : true,
+    "cgroup":
+    {
+        "cpuacct":
+        {
+            "enabled"         : true
+        },
+        "cpuset":
+        {
+            "enabled"         : true
+        },
+        "devices":
+        {
+            "enabled"         : true,
+            "exclude_hosts"   : [],
+            "exclude_vntypes" : [],
+            "allow"           : [
+                "b *:* rwm",
+                ["console","rwm"],
+                ["tty0","rwm", "*"],
+                "c 1:* rwm",
+                "c 10:* rwm"
+            ]
+        },
+        "hugetlb":
+        {
+            "enabled"         : false
+        },
+        "memory":
+        {
+            "enabled"         : true,
+            "default"         : "96MB",
+            "reserve_amount"  : "50MB"
+        },
+        "memsw":
+        {
+            "enabled"         : %s,
+            "default"         : "96MB",
+            "reserve_amount"  : "45MB"
+        }
+    }
+}
 """
         Job.dflt_attributes[ATTR_k] = 'oe'
         # Increase the server log level
@@ -802,6 +884,26 @@ if %s e.job.in_ms_mom():
                     paths['devices'] = paths[subsys]
         return paths
 
+    def get_cgroup2_path(self):
+        """
+        Returns the mount point of the cgroup v2 unified hierarchy when no
+        controller is mounted on a cgroup v1 hierarchy, otherwise None.
+        """
+        path = None
+        with open(os.path.join(os.sep, 'proc', 'mounts'), 'r') as fd:
+            for line in fd:
+                entries = line.split()
+                if entries[2] == 'cgroup2':
+                    path = entries[1]
+                elif entries[2] == 'cgroup':
+                    flags = entries[3].split(',')
+                    for subsys in ['blkio', 'cpu', 'cpuacct', 'cpuset',
+                                   'devices', 'freezer', 'hugetlb',
+                                   'memory', 'pids']:
+                        if subsys in flags:
+                            return None
+        return path
+
     def is_dir(self, cpath, host):
         """
         Returns True if path exists otherwise false
@@ -835,6 +937,41 @@ if %s e.job.in_ms_mom():
             return os.path.join(basedir, 'pbspro.slice',
                                 'pbspro-%s.slice' % systemd_escape(jobid))
 
+    def get_cgroup2_job_dir(self, jobid, host):
+        """
+        Returns path of the job directory on the cgroup v2 hierarchy
+        """
+        basedir = self.cgroup2_path
+        if self.du.isdir(hostname=host, path=os.path.join(basedir, 'pbspro')):
+            return os.path.join(basedir, 'pbspro', jobid)
+        else:
+            return os.path.join(basedir, 'pbspro.slice',
+                                'pbspro-%s.slice' % systemd_escape(jobid))
+
+    def get_numa_cpus(self, host, numa):
+        """
+        Returns the list of CPUs of a NUMA node of the host
+        """
+        fn = os.path.join(os.sep, 'sys', 'devices', 'system', 'node',
+                          'node%d' % numa, 'cpulist')
+        result = self.du.cat(hostname=host, filename=fn)
+        if result['rc'] != 0 or not result['out']:
+            return []
+        return expand_list(result['out'][0])
+
+    def get_job_cpuset(self, jobid, host):
+        """
+        Returns the lists of CPUs and memory nodes in the cpuset of a job
+        """
+        ret = []
+        basedir = self.get_cgroup_job_dir('cpuset', jobid, host)
+        for name in ['cpuset.cpus', 'cpuset.mems']:
+            fn = os.path.join(basedir, name)
+            result = self.du.cat(hostname=host, filename=fn, sudo=True)
+            self.assertEqual(result['rc'], 0, 'Failed to read %s' % fn)
+            ret.append(expand_list(result['out'][0]))
+        return ret
+
     def load_hook(self, filename):
         """
         Import and enable a hook pointed to by the URL specified.
@@ -1411,6 +1548,76 @@ if %s e.job.in_ms_mom():
                             'Processes should be assigned to different CPUs')
         self.logger.info('CpuIDs check passed')
 
+    def test_cgroup_cpuset_numa_locality(self):
+        """
+        Confirm that a job that fits on one NUMA node gets all of its CPUs
+        from the node in its cpuset.mems, and that its CPUs stay on the
+        NUMA node it keeps when it is resized
+        """
+        host = self.hosts_list[0]
+        for numa in [0, 1]:
+            if len(self.get_numa_cpus(host, numa)) < 4:
+                self.skipTest('Test requires two NUMA nodes with at '
+                              'least four CPUs each')
+        # Let the hook choose the NUMA node for the job
+        self.load_config(self.cfg5 % ('false', '', 'true', 'false',
+                                      'false', self.swapctl))
+        self.server.expect(NODE, {'state': 'free'},
+                           id=self.nodes_list[0], interval=3, offset=10)
+        a = {'Resource_List.select': '1:ncpus=2:mem=100mb:host=%s' % host}
+        j = Job(TEST_USER, attrs=a)
+        j.create_script(self.sleep300_job)
+        jid = self.server.submit(j)
+        self.server.expect(JOB, {'job_state': 'R'}, jid)
+        (cpus, mems) = self.get_job_cpuset(jid, host)
+        self.logger.info('cpus=%s mems=%s' % (cpus, mems))
+        self.assertEqual(len(cpus), 2)
+        self.assertEqual(len(mems), 1,
+                         'Job memory spans NUMA nodes %s' % mems)
+        numa_cpus = self.get_numa_cpus(host, mems[0])
+        self.assertTrue(set(cpus) <= set(numa_cpus),
+                        'Job CPUs %s not all on NUMA node %d (%s)' %
+                        (cpus, mems[0], numa_cpus))
+        self.server.delete(id=jid, wait=True)
+        # Start a job on both NUMA node vnodes, then have the launch hook
+        # release one of them so that the job is resized
+        self.load_config(self.cfg5 % ('true', '', 'true', 'false',
+                                      'false', self.swapctl))
+        vnodes = ['%s[%d]' % (self.nodes_list[0], i) for i in [0, 1]]
+        for vnode in vnodes:
+            self.server.expect(VNODE, {'state': 'free'}, id=vnode,
+                               interval=3, offset=10)
+        hook_event = 'execjob_launch'
+        hook_name = 'launch'
+        a = {'event': hook_event, 'enabled': 'true'}
+        self.server.create_import_hook(
+            hook_name, a, self.launch_hook_body % ('"ncpus=1:mem=100mb"'))
+        a = {'Resource_List.select':
+             '1:ncpus=1:mem=100mb:vnode=%s+1:ncpus=1:mem=100mb:vnode=%s' %
+             tuple(vnodes),
+             ATTR_tolerate_node_failures: 'job_start'}
+        j = Job(TEST_USER, attrs=a)
+        j.create_script(self.sleep300_job)
+        stime = int(time.time())
+        jid = self.server.submit(j)
+        self.server.expect(JOB, {ATTR_substate: '42'}, id=jid)
+        self.moms_list[0].log_match(
+            'Hook handler returned success for execjob_resize event',
+            starttime=stime)
+        job_stat = self.server.status(JOB, 'exec_vnode', id=jid)
+        execvnode = job_stat[0]['exec_vnode']
+        self.logger.info('pruned exec_vnode: %s' % execvnode)
+        self.assertEqual(len(execvnode.split('+')), 1)
+        kept = int(execvnode.split(':')[0].split('[')[1].split(']')[0])
+        (cpus, mems) = self.get_job_cpuset(jid, host)
+        self.logger.info('cpus=%s mems=%s' % (cpus, mems))
+        self.assertEqual(len(cpus), 1)
+        self.assertEqual(mems, [kept])
+        numa_cpus = self.get_numa_cpus(host, kept)
+        self.assertTrue(set(cpus) <= set(numa_cpus),
+                        'Resized job CPUs %s not on NUMA node %d (%s)' %
+                        (cpus, kept, numa_cpus))
+
     def test_cgroup_enforce_memory(self):
         """
         Test to verify that the job is killed when it tries to
@@ -1470,6 +1677,38 @@ if %s e.job.in_ms_mom():
         self.assertTrue('MemoryError' in tmp_out,
                         'MemoryError not present in output')
 
+    def test_cgroup_oom_notification(self):
+        """
+        Test to verify that with memory oom_notification enabled, the OOM
+        watcher started for the job reports that the job exceeded its
+        memory limit
+        """
+        if have_swap() and self.swapctl != 'true':
+            self.skipTest('swap space is available without memsw control')
+        name = 'CGROUP_OOM'
+        cfg = self.cfg3 % ('', '', '', self.swapctl, '')
+        cfg = cfg.replace('"reserve_amount"  : "50MB",',
+                          '"reserve_amount"  : "50MB",\n'
+                          '            "oom_notification": true,')
+        self.load_config(cfg)
+        a = {'Resource_List.select': '1:ncpus=1:mem=300mb:host=%s' %
+             self.hosts_list[0], ATTR_N: name}
+        j = Job(TEST_USER, attrs=a)
+        j.create_script(self.eatmem_job1)
+        stime = int(time.time())
+        jid = self.server.submit(j)
+        self.server.expect(JOB, {'job_state': 'R'}, jid)
+        self.server.status(JOB, ATTR_o, jid)
+        self.tempfile.append(j.attributes[ATTR_o])
+        self.moms_list[0].log_match('%s;.*OOM watcher started' % jid,
+                                    regexp=True, starttime=stime)
+        # the watcher reports the event when the job ends
+        self.server.expect(JOB, 'queue', id=jid, op=UNSET, max_attempts=60,
+                           interval=1, offset=1)
+        self.moms_list[0].log_match(
+            '%s;Cgroup memory limit exceeded \\(\\d+ OOM events' % jid,
+            regexp=True, starttime=stime, max_attempts=20)
+
     def test_cgroup_offline_node(self):
         """
         Test to verify that the node is offlined when it can't clean up
@@ -1899,6 +2138,52 @@ if %s e.job.in_ms_mom():
                                  % filename)
                 self.assertFalse(os.path.isfile(filename))
 
+    def test_cgroup_periodic_should_delete_journaled_cgroup(self):
+        """
+        Test to verify that if neither the execjob_epilogue nor the
+        execjob_end hook cleaned up the cgroup for a job, the
+        exechost_periodic hook removes it using the reconciliation
+        journal before the next full orphan sweep
+        """
+        self.load_config(self.cfg4 % (self.swapctl))
+        # remove epilogue and end from the list of events
+        attr = {'enabled': 'True', 'freq': 2,
+                'event': '"execjob_begin,execjob_launch,'
+                         'execjob_attach,exechost_periodic,'
+                         'exechost_startup"'}
+        now = int(time.time())
+        self.server.manager(MGR_CMD_SET, HOOK, attr, self.hook_name)
+        self.server.expect(NODE, {'state': 'free'}, id=self.nodes_list[0])
+        # let a periodic event run first, so that a full orphan sweep that
+        # is due happens before the job starts
+        self.moms_list[0].log_match('_exechost_periodic_handler: Method '
+                                    'called', starttime=now)
+        a = {'Resource_List.select': '1:ncpus=1:host=%s' %
+             self.hosts_list[0]}
+        j = Job(TEST_USER, attrs=a)
+        j.set_sleep_time(5)
+        jid = self.server.submit(j)
+        self.server.expect(JOB, {'job_state': 'R'}, jid)
+        stime = int(time.time())
+        cpath = self.get_cgroup_job_dir('cpuset', jid, self.hosts_list[0])
+        self.assertTrue(self.is_dir(cpath, self.hosts_list[0]))
+        # wait for job to finish
+        self.server.expect(JOB, 'queue', id=jid, op=UNSET, max_attempts=20,
+                           interval=1, offset=1)
+        # the journal records the job, so it is cleaned up without a
+        # full sweep of the cgroup directories
+        for _ in range(10):
+            if not self.is_dir(cpath, self.hosts_list[0]):
+                break
+            time.sleep(2)
+        self.assertFalse(self.is_dir(cpath, self.hosts_list[0]))
+        self.moms_list[0].log_match('reconcile_orphans: Removing cgroups of '
+                                    'journaled job %s' % jid,
+                                    starttime=stime)
+        self.moms_list[0].log_match('Performing full orphan sweep',
+                                    starttime=stime, existence=False,
+                                    max_attempts=1)
+
     @skipOnCray
     def test_cgroup_assign_resources_mem_only_vnode(self):
         """
@@ -2716,6 +3001,105 @@ event.accept()
         a = {'job_state': 'R'}
         self.server.expect(JOB, a, jid)
 
+    def test_cgroup_v2_memory_limits(self):
+        """
+        Test to verify that with cgroup v2 the memory limit of the job is
+        written to memory.max and, with memsw enabled, that
+        memory.swap.max holds the part of vmem above mem
+        """
+        name = 'CGROUP_V2_MEM'
+        self.load_config(self.cfg_v2 % self.swapctl)
+        select = '1:ncpus=1:mem=300mb'
+        if self.swapctl == 'true':
+            select += ':vmem=400mb'
+        a = {'Resource_List.select': '%s:host=%s' %
+             (select, self.hosts_list[0]), ATTR_N: name}
+        j = Job(TEST_USER, attrs=a)
+        j.set_sleep_time(30)
+        jid = self.server.submit(j)
+        self.server.expect(JOB, {'job_state': 'R'}, jid)
+        cpath = self.get_cgroup2_job_dir(jid, self.hosts_list[0])
+        self.assertTrue(self.is_dir(cpath, self.hosts_list[0]))
+        out = self.du.cat(hostname=self.hosts_list[0],
+                          filename=os.path.join(cpath, 'memory.max'),
+                          sudo=True)['out']
+        self.assertEqual(out, ['314572800'])
+        if self.swapctl == 'true':
+            out = self.du.cat(hostname=self.hosts_list[0],
+                              filename=os.path.join(cpath, 'memory.swap.max'),
+                              sudo=True)['out']
+            self.assertEqual(out, ['104857600'])
+
+    def test_cgroup_v2_attach_procs(self):
+        """
+        Test to verify that with cgroup v2 the job processes are attached
+        to the job cgroup through its cgroup.procs file
+        """
+        name = 'CGROUP_V2_PROCS'
+        self.load_config(self.cfg_v2 % self.swapctl)
+        a = {'Resource_List.select': '1:ncpus=1:host=%s' %
+             self.hosts_list[0], ATTR_N: name}
+        j = Job(TEST_USER, attrs=a)
+        j.create_script('#PBS -joe\n'
+                        'cat /proc/self/cgroup\n'
+                        'sleep 20\n')
+        jid = self.server.submit(j)
+        self.server.expect(JOB, {'job_state': 'R'}, jid)
+        self.server.status(JOB, [ATTR_o, 'exec_host'], jid)
+        filename = j.attributes[ATTR_o]
+        self.tempfile.append(filename)
+        cpath = self.get_cgroup2_job_dir(jid, self.hosts_list[0])
+        out = self.du.cat(hostname=self.hosts_list[0],
+                          filename=os.path.join(cpath, 'cgroup.procs'),
+                          sudo=True)['out']
+        self.assertTrue([pid for pid in out if pid.strip()],
+                        'No process in %s/cgroup.procs' % cpath)
+        tmp_out = self.wait_and_read_file(filename=filename.split(':')[1],
+                                          host=self.hosts_list[0])
+        relpath = '0::/' + os.path.relpath(cpath, self.cgroup2_path)
+        self.assertTrue(relpath in tmp_out,
+                        '"%s" not found in: %s' % (relpath, tmp_out))
+
+    def test_cgroup_v2_devices_no_gpu(self):
+        """
+        Test to verify that with cgroup v2 the device filter of a job
+        that did not request GPUs denies opening the /dev/nvidia* devices
+        while still allowing the devices in the allow list
+        """
+        rv = self.du.run_cmd(hosts=self.hosts_list[0],
+                             cmd=['ls', '/dev/nvidia0'], logerr=False)
+        if rv['rc'] != 0:
+            self.skipTest('no NVIDIA GPU device on %s' % self.hosts_list[0])
+        name = 'CGROUP_V2_DEV'
+        self.load_config(self.cfg_v2 % self.swapctl)
+        a = {'Resource_List.select': '1:ncpus=1:host=%s' %
+             self.hosts_list[0], ATTR_N: name}
+        j = Job(TEST_USER, attrs=a)
+        j.create_script('#PBS -joe\n'
+                        'for dev in /dev/null /dev/nvidia*; do\n'
+                        '    [ -c "$dev" ] || continue\n'
+                        '    if head -c 0 "$dev" 2>/dev/null; then\n'
+                        '        echo "OPENED $dev"\n'
+                        '    else\n'
+                        '        echo "DENIED $dev"\n'
+                        '    fi\n'
+                        'done\n'
+                        'sleep 10\n')
+        jid = self.server.submit(j)
+        self.server.expect(JOB, {'job_state': 'R'}, jid)
+        self.server.status(JOB, ATTR_o, jid)
+        filename = j.attributes[ATTR_o]
+        self.tempfile.append(filename)
+        tmp_out = self.wait_and_read_file(filename=filename.split(':')[1],
+                                          host=self.hosts_list[0])
+        self.assertTrue('OPENED /dev/null' in tmp_out,
+                        'Allowed device not opened: %s' % tmp_out)
+        self.assertTrue('DENIED /dev/nvidia0' in tmp_out,
+                        'GPU device not denied: %s' % tmp_out)
+        self.assertFalse([line for line in tmp_out
+                          if line.startswith('OPENED /dev/nvidia')],
+                         'GPU device opened: %s' % tmp_out)
+
     def tearDown(self):
         TestFunctional.tearDown(self)
         self.load_default_config()
@@ -0,0 +1,141 @@
+# coding: utf-8
+
+# Copyright (C) 1994-2019 Altair Engineering, Inc.
+# For more information, contact Altair at www.altair.com.
+#
+# This file is part of the PBS Professional ("PBS Pro") software.
+#
+# Open Source License Information:
+#
+# PBS Pro is free software. You can redistribute it and/or modify it under the
+# terms of the GNU Affero General Public License as published by the Free
+# Software Foundation, either version 3 of the License, or (at your option) any
+# later version.
+#
+# PBS Pro is distributed in the hope that it will be useful, but WITHOUT ANY
+# WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+# FOR A PARTICULAR PURPOSE.
+# See the GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+# Commercial License Information:
+#
+# For a copy of the commercial license terms and conditions,
+# go to: (http://www.pbspro.com/UserArea/agreement.html)
+# or contact the Altair Legal Department.
+#
+# Altair’s dual-license business model allows companies, individuals, and
+# organizations to create proprietary derivative works of PBS Pro and
+# distribute them - whether embedded or bundled with other software -
+# under a commercial license agreement.
+#
+# Use of Altair’s trademarks, including but not limited to "PBS™",
+# "PBS Professional®", and "PBS Pro™" and Altair’s logos is subject to Altair's
+# trademark licensing policies.
+from tests.functional import *
+
+
+class TestHookServerQuery(TestFunctional):
+    """
+    Tests the pbs.server() object lookups (job(), vnode(), queue(), resv())
+    made from a mom hook, which query the server through pbs_statobj().
+    """
+
+    def setUp(self):
+        TestFunctional.setUp(self)
+        self.hostA = self.mom.shortname
+        a = {'resources_available.ncpus': 2,
+             'comment': 'query test node'}
+        self.server.manager(MGR_CMD_SET, NODE, a, id=self.hostA)
+
+    def submit_with_hook(self, hook_body):
+        """
+        Install an execjob_begin hook with 'hook_body' and submit a job
+        that runs on the local mom, returning its job id.
+        """
+        a = {'event': 'execjob_begin', 'enabled': 'True'}
+        self.server.create_import_hook("query", a, hook_body)
+        j = Job(TEST_USER)
+        j.set_sleep_time(1)
+        return self.server.submit(j)
+
+    def test_vnode_attribs(self):
+        """
+        Test that pbs.server().vnode() obtains only the attributes given
+        in its attribs list, and all of them without one.
+        """
+        hook_body = """
+import pbs
+e = pbs.event()
+name = pbs.get_local_nodename()
+vn = pbs.server().vnode(name, ["state", "resources_available.ncpus"])
+pbs.logmsg(pbs.LOG_DEBUG, "projected: ncpus=%s comment=%s" %
+           (vn.resources_available["ncpus"], vn.comment))
+vn = pbs.server().vnode(name)
+pbs.logmsg(pbs.LOG_DEBUG, "full: ncpus=%s comment=%s" %
+           (vn.resources_available["ncpus"], vn.comment))
+"""
+        self.submit_with_hook(hook_body)
+        self.mom.log_match("projected: ncpus=2 comment=None")
+        self.mom.log_match("full: ncpus=2 comment=query test node")
+
+    def test_connection_reused(self):
+        """
+        Test that several server lookups in one hook invocation share
+        a single connection to the server.
+        """
+        hook_body = """
+import pbs
+from pbs.v1._svr_types import _pbs_connections
+e = pbs.event()
+s = pbs.server()
+name = pbs.get_local_nodename()
+for i in range(5):
+    s.vnode(name, ["state"])
+    s.job(e.job.id, ["job_state"])
+    s.queue("workq", ["state_count"])
+pbs.logmsg(pbs.LOG_DEBUG, "connections=%d" % len(_pbs_connections))
+"""
+        self.submit_with_hook(hook_body)
+        self.mom.log_match("connections=1")
+
+    def test_lookup_cached(self):
+        """
+        Test that repeated lookups of an object within one event return
+        the object obtained first, unless fresh=True is given.
+        """
+        hook_body = """
+import pbs
+e = pbs.event()
+s = pbs.server()
+name = pbs.get_local_nodename()
+vn = s.vnode(name)
+pbs.logmsg(pbs.LOG_DEBUG, "cached=%s subset=%s fresh=%s" %
+           (s.vnode(name) is vn, s.vnode(name, ["state"]) is vn,
+            s.vnode(name, fresh=True) is vn))
+"""
+        self.submit_with_hook(hook_body)
+        self.mom.log_match("cached=True subset=True fresh=False")
+
+    def test_stream_jobs(self):
+        """
+        Test that pbs.server().jobs() with an attribute list and batch
+        size returns every job, with only the listed attributes set.
+        """
+        a = {'resources_available.ncpus': 8}
+        self.server.manager(MGR_CMD_SET, NODE, a, id=self.hostA)
+        for _ in range(4):
+            j = Job(TEST_USER)
+            j.set_sleep_time(100)
+            self.server.submit(j)
+        hook_body = """
+import pbs
+e = pbs.event()
+jobs = list(pbs.server().jobs(["job_state"], batch_size=2))
+pbs.logmsg(pbs.LOG_DEBUG, "streamed=%d state=%s owner=%s" %
+           (len(jobs), jobs[0].job_state is not None, jobs[0].Job_Owner))
+"""
+        self.submit_with_hook(hook_body)
+        self.mom.log_match("streamed=5 state=True owner=None")
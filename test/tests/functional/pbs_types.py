@@ -67,3 +67,121 @@ pbs.logmsg(pbs.EVENT_DEBUG, 'd=%s, e=%s, f=%s' % (d, e, f))
         self.server.submit(j)
         self.server.log_match("a=1000b, b=1000b, c=1000b")
         self.server.log_match("d=1mb, e=1mb, f=1mb")
+
+    def test_pbs_size_compare_arith(self):
+        """
+        Test comparison, hashing and arithmetic of pbs.size values
+        """
+        hook_content = ("""
+import pbs
+a = pbs.size('10gb')
+b = pbs.size('10mb')
+pbs.logmsg(pbs.EVENT_DEBUG, 'sum=%s diff=%s words=%s mixed=%s' %
+           (a + b, a - b, pbs.size('2kw') + pbs.size('1kw'),
+            pbs.size('1kb') + 1))
+pbs.logmsg(pbs.EVENT_DEBUG, 'gt=%s eq=%s int=%s str=%s hash=%s' %
+           (a > b, pbs.size('1kb') == pbs.size(1024), b > 1024,
+            a != 'x', len(set([pbs.size('1kb'), pbs.size(1024)]))))
+s = sorted([a, b, pbs.size('3kb')])
+pbs.logmsg(pbs.EVENT_DEBUG, 'sorted=%s' % ",".join([str(x) for x in s]))
+""")
+        hook_name = 'size_ops'
+        hook_attr = {'enabled': 'true', 'event': 'queuejob'}
+        self.server.create_import_hook(hook_name, hook_attr, hook_content)
+
+        j = Job(TEST_USER)
+        self.server.submit(j)
+        self.server.log_match("sum=10250mb diff=10230mb words=3kw mixed=1025b")
+        self.server.log_match("gt=True eq=True int=True str=True hash=1")
+        self.server.log_match("sorted=3kb,10mb,10gb")
+
+    def test_pbs_select_exec_vnode_chunks(self):
+        """
+        Test increment_chunks on pbs.select values and the chunks and
+        per-vnode lookups of pbs.exec_vnode values, including after the
+        chunk list is changed in place
+        """
+        hook_content = ("""
+import pbs
+sel = pbs.select('ncpus=3:mem=1gb+1:ncpus=2:mem=2gb+2:ncpus=1:mem=3gb')
+pbs.logmsg(pbs.EVENT_DEBUG, 'inc=%s pct=%s' %
+           (sel.increment_chunks(2), sel.increment_chunks('23.5%')))
+ev = pbs.exec_vnode('(vA:ncpus=1:mem=2gb)+(vB:ncpus=2+vC:mem=1kb)+' +
+                    '(vA:ncpus=4)')
+pbs.logmsg(pbs.EVENT_DEBUG, 'vnodes=%s vA=%s vZ=%s' %
+           (",".join([c.vnode_name for c in ev.chunks]),
+            sum([c.chunk_resources['ncpus'] for c in ev.vnode_chunks('vA')]),
+            len(ev.vnode_chunks('vZ'))))
+ev.chunks.append(pbs.vchunk('vD:ncpus=1'))
+ev.chunks[0].vnode_name = 'vX'
+pbs.logmsg(pbs.EVENT_DEBUG, 'vA=%d vD=%d vX=%d' %
+           (len(ev.vnode_chunks('vA')), len(ev.vnode_chunks('vD')),
+            len(ev.vnode_chunks('vX'))))
+""")
+        hook_name = 'chunk_ops'
+        hook_attr = {'enabled': 'true', 'event': 'queuejob'}
+        self.server.create_import_hook(hook_name, hook_attr, hook_content)
+
+        j = Job(TEST_USER)
+        self.server.submit(j)
+        self.server.log_match("inc=1:ncpus=3:mem=1gb+3:ncpus=2:mem=2gb+"
+                              "4:ncpus=1:mem=3gb pct=1:ncpus=3:mem=1gb+"
+                              "2:ncpus=2:mem=2gb+3:ncpus=1:mem=3gb")
+        self.server.log_match("vnodes=vA,vB,vC,vA vA=5 vZ=0")
+        self.server.log_match("vA=1 vD=1 vX=1")
+
+    def test_pbs_resource_caseless_name(self):
+        """
+        Test that resources set in a hook with differently cased names
+        map to the defined resources
+        """
+        hook_content = ("""
+import pbs
+e = pbs.event()
+e.job.Resource_List['NCPUS'] = 2
+e.job.Resource_List.WallTime = pbs.duration('00:10:00')
+pbs.logmsg(pbs.EVENT_DEBUG, 'ncpus=%s walltime=%s' %
+           (e.job.Resource_List['ncpus'], e.job.Resource_List['walltime']))
+""")
+        hook_name = 'resc_case'
+        hook_attr = {'enabled': 'true', 'event': 'queuejob'}
+        self.server.create_import_hook(hook_name, hook_attr, hook_content)
+
+        j = Job(TEST_USER)
+        jid = self.server.submit(j)
+        self.server.log_match("ncpus=2 walltime=00:10:00")
+        self.server.expect(JOB, {'Resource_List.ncpus': 2,
+                                 'Resource_List.walltime': '00:10:00'},
+                           id=jid)
+
+    def test_pbs_hook_changes(self):
+        """
+        Test that pbs.get_changes() and pbs.has_changes() report the
+        attributes and resources set in a hook
+        """
+        hook_content = ("""
+import pbs
+e = pbs.event()
+j = e.job
+pbs.logmsg(pbs.EVENT_DEBUG, 'before=%s' % pbs.has_changes())
+j.Priority = 10
+j.Resource_List['walltime'] = pbs.duration('00:05:00')
+j.Resource_List['ncpus'] = 3
+j.Resource_List['ncpus'] = j.Resource_List['ncpus']
+ch = sorted([(a, r, str(n)) for (a, r, o, n) in pbs.get_changes(j)])
+pbs.logmsg(pbs.EVENT_DEBUG, 'changes=%s' % ch)
+pbs.logmsg(pbs.EVENT_DEBUG, 'after=%s' % pbs.has_changes())
+""")
+        hook_name = 'hook_changes'
+        hook_attr = {'enabled': 'true', 'event': 'queuejob'}
+        self.server.create_import_hook(hook_name, hook_attr, hook_content)
+
+        j = Job(TEST_USER, attrs={'Resource_List.ncpus': 3})
+        jid = self.server.submit(j)
+        self.server.log_match("before=False")
+        self.server.log_match("changes=[('Priority', None, '10'), "
+                              "('Resource_List', 'walltime', '00:05:00')]")
+        self.server.log_match("after=True")
+        self.server.expect(JOB, {'Priority': 10,
+                                 'Resource_List.walltime': '00:05:00'},
+                           id=jid)
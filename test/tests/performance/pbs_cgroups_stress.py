@@ -255,3 +255,78 @@ class TestCgroupsStress(TestPerformance):
         # Check the logs one last time to ensure it passed
         self.mom.log_match(msg="IOError", starttime=now,
                            existence=False, max_attempts=10, n="ALL")
+
+    def run_job_array(self, njobs):
+        """
+        Submit an array of njobs single core jobs while scheduling is
+        off, then let them all run. Return the number of seconds between
+        enabling scheduling and the array job finishing, and the time
+        spent by the hook in each event meanwhile.
+        """
+        self.server.manager(MGR_CMD_SET, SERVER, {'scheduling': 'False'})
+        j = Job(TEST_USER, attrs={ATTR_J: '1-%d' % njobs,
+                                  'Resource_List.select': 'ncpus=1'})
+        j.create_script(self.true_script)
+        jid = self.server.submit(j)
+        start = time.time()
+        self.server.manager(MGR_CMD_SET, SERVER, {'scheduling': 'True'})
+        self.server.expect(JOB, {'job_state': 'F'}, id=jid, extend='x',
+                           interval=1, max_attempts=1200)
+        elapsed = time.time() - start
+        try:
+            lines = self.mom.log_match('pbs_cgroups;Elapsed time:',
+                                       starttime=int(start), allmatch=True,
+                                       n='ALL', max_attempts=1)
+        except PtlLogMatchError:
+            lines = []
+        durations = []
+        for (_, line) in lines:
+            try:
+                durations.append(float(line.rsplit(':', 1)[1]))
+            except ValueError:
+                continue
+        self.mom.log_match(msg='IOError', starttime=int(start),
+                           existence=False, max_attempts=1, n='ALL')
+        return (elapsed, durations)
+
+    @timeout(2400)
+    def test_cgroups_concurrent_job_throughput(self):
+        """
+        Measure how quickly the cgroups hook processes the events of many
+        single core jobs started at the same time on one node. Events for
+        different jobs only share the node lock, so they should no longer
+        be handled strictly one at a time.
+        The same job array is run twice: first with serialize_events set,
+        which holds one exclusive lock for every event as older hooks did,
+        then with the default locking. The second run must finish sooner.
+        """
+        njobs = 128
+        attr = {'job_history_enable': 'true'}
+        self.server.manager(MGR_CMD_SET, SERVER, attr)
+        a = {'resources_available.ncpus': njobs}
+        self.server.manager(MGR_CMD_SET, NODE, a, id=self.mom.shortname)
+        # Keep the memory limits small so that all jobs fit on the node
+        cfg = (self.cfg0 % self.swapctl).replace('256MB', '16MB')
+        prefix = '"cgroup_prefix"         : "pbspro",'
+        elapsed = {}
+        for serialize in ('true', 'false'):
+            self.load_config(cfg.replace(
+                prefix, prefix + '\n    "serialize_events"      : %s,' %
+                serialize))
+            (elapsed[serialize], durations) = self.run_job_array(njobs)
+            if serialize == 'true':
+                name = 'serialized_'
+            else:
+                name = ''
+            self.logger.info('%d jobs finished in %0.2f seconds with '
+                             'serialize_events %s' %
+                             (njobs, elapsed[serialize], serialize))
+            self.perf_test_result(njobs / elapsed[serialize],
+                                  name + 'job_throughput', 'jobs/sec')
+            if durations:
+                self.perf_test_result(durations,
+                                      name + 'hook_event_duration', 'sec')
+        self.assertLess(elapsed['false'], elapsed['true'],
+                        'Jobs took %0.2f seconds with concurrent events, '
+                        'not less than the %0.2f seconds with serialized '
+                        'events' % (elapsed['false'], elapsed['true']))